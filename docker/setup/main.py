@@ -11,26 +11,50 @@ Steps:
 
 import asyncio
 from base64 import urlsafe_b64decode
+from contextlib import suppress
 from functools import partial, wraps
-import json
+from operator import truth
 from os import getenv
 from typing import Any, Awaitable, Callable, Mapping, Optional, TypeVar, cast
+from urllib.parse import parse_qs, urlparse
 
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits, Response
 
 from controller.controller import Controller
 from controller.models import InvitationRecord
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 PROXY = getenv("PROXY", "http://localhost:3000")
 AGENT = getenv("AGENT", "http://localhost:3001")
-AGENT_HEADERS = getenv("AGENT_HEADERS", "{}")
+AGENT_HEADERS = json_loads(getenv("AGENT_HEADERS", "{}"))
 MEDIATOR = getenv("MEDIATOR")
 MEDIATOR_INVITE = getenv("MEDIATOR_INVITE")
+LONG_POLL_WAIT = 30.0
+# Total time allowed for polls whose attempts are long polls
+LONG_POLL_DEADLINE = 30.0
+PROXY_LIMITS = Limits(max_connections=20, max_keepalive_connections=20)
+CREATE_INVITATION_BODY = {
+    "accept": ["didcomm/aip1", "didcomm/aip2;env=rfc19"],
+    "handshake_protocols": [
+        "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/didexchange/1.0",
+        "https://didcomm.org/didexchange/1.0",
+    ],
+    "protocol_version": "1.1",
+}
 
 Subject = TypeVar("Subject")
 Func = TypeVar("Func", bound=Callable)
 
 
+def b64url_decode(value: str) -> bytes:
+    """Decode urlsafe base64, tolerating stripped padding."""
+    return urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
 class PollingFailed(Exception):
     """Raised when polling fails."""
 
@@ -40,15 +64,34 @@ async def poll(
     condition: Callable[[Subject], bool],
     *,
     interval: float = 3.0,
-    max_retry: int = 10,
+    min_interval: float = 0.1,
+    factor: float = 1.5,
+    max_retry: int = 17,
+    timeout: Optional[float] = None,
     error_msg: Optional[str] = None,
 ) -> Subject:
-    count = 0
-    subject = await operation()
-    while not condition(subject) and count < max_retry:
-        count += 1
-        await asyncio.sleep(interval)
+    """Retry operation until condition is met, backing off exponentially.
+
+    The delay between attempts starts at min_interval and grows by factor on
+    each retry, capped at interval. If timeout is given, polling also fails once
+    that many seconds have passed in total, whatever retries are left.
+    """
+
+    async def _retry() -> Subject:
+        count = 0
+        current = min_interval
         subject = await operation()
+        while not condition(subject) and count < max_retry:
+            count += 1
+            await asyncio.sleep(current)
+            current = min(current * factor, interval)
+            subject = await operation()
+        return subject
+
+    try:
+        subject = await asyncio.wait_for(_retry(), timeout)
+    except asyncio.TimeoutError:
+        raise PollingFailed(error_msg or "Polling failed") from None
 
     if not condition(subject):
         raise PollingFailed(error_msg or "Polling failed")
@@ -61,7 +104,10 @@ def poller(
     *,
     until: Optional[Callable[[Any], bool]] = None,
     interval: float = 3.0,
-    max_retry: int = 10,
+    min_interval: float = 0.1,
+    factor: float = 1.5,
+    max_retry: int = 17,
+    timeout: Optional[float] = None,
     error_msg: Optional[str] = None,
 ) -> Func:
     if not func:
@@ -71,13 +117,16 @@ def poller(
                 f,
                 until=until,
                 interval=interval,
+                min_interval=min_interval,
+                factor=factor,
                 max_retry=max_retry,
+                timeout=timeout,
                 error_msg=error_msg,
             ),
         )
 
     if not until:
-        until = bool
+        until = truth
 
     @wraps(func)
     async def _poll_wrapper(*args, **kwargs):
@@ -85,7 +134,10 @@ def poller(
             partial(func, *args, **kwargs),
             until,
             interval=interval,
+            min_interval=min_interval,
+            factor=factor,
             max_retry=max_retry,
+            timeout=timeout,
             error_msg=error_msg,
         )
 
@@ -98,87 +150,136 @@ class Proxy:
     def __init__(self, client: AsyncClient):
         self.client = client
 
+    async def _long_poll(self, url: str, **params) -> Response:
+        """GET url, asking the proxy to hold the request until there is news.
+
+        Proxies without long poll support reject or ignore the wait parameter;
+        callers keep polling in that case.
+        """
+        r = await self.client.get(url, params={"wait": LONG_POLL_WAIT, **params})
+        if r.status_code == 400:
+            r = await self.client.get(url, params=params)
+        return r
+
     async def receive_mediator_invite(self, invite: str):
         r = await self.client.post(
             "/receive_mediator_invitation", json={"invitation_url": invite}
         )
-        assert not r.is_error
+        r.raise_for_status()
 
-    async def get_status(self) -> str:
-        r = await self.client.get("/status")
-        assert not r.is_error
-        return r.json().get("status")
+    async def get_status(self, *, wait_from: Optional[str] = None) -> str:
+        if wait_from:
+            r = await self._long_poll("/status", current=wait_from)
+        else:
+            r = await self.client.get("/status")
+        r.raise_for_status()
+        return json_loads(r.content).get("status")
 
     async def await_status(self, state: str):
         return await poll(
             self.get_status,
             lambda retrieved: retrieved == state,
             interval=1,
-            max_retry=3,
+            max_retry=7,
         )
 
-    @poller(until=lambda state: state != "init")
-    async def initialized(self):
-        return await self.get_status()
+    @poller(until=lambda state: state != "init", timeout=LONG_POLL_DEADLINE)
+    async def _poll_initialized(self):
+        return await self.get_status(wait_from="init")
+
+    async def initialized(self) -> str:
+        """Wait for the proxy to leave the init state.
+
+        Follows state transitions pushed by the proxy, falling back to polling
+        for proxies that do not offer the status stream. Either way, waiting
+        fails after LONG_POLL_DEADLINE seconds.
+        """
+
+        async def _first_state(r: Response) -> Optional[str]:
+            async for line in r.aiter_lines():
+                if line.strip():
+                    state = json_loads(line)["status"]
+                    if state != "init":
+                        return state
+            return None
+
+        async with self.client.stream("GET", "/status/stream") as r:
+            if r.status_code == 404:
+                return await self._poll_initialized()
+            r.raise_for_status()
+            try:
+                state = await asyncio.wait_for(_first_state(r), LONG_POLL_DEADLINE)
+            except asyncio.TimeoutError:
+                raise PollingFailed("Proxy was not initialized in time") from None
+        if not state:
+            raise PollingFailed("Status stream closed before proxy was initialized")
+        return state
 
     @poller(
+        timeout=LONG_POLL_DEADLINE,
         error_msg=(
             "Failed to retrieve invitation from proxy. "
             "Did the proxy successfully connect to mediator?"
-        )
+        ),
     )
     async def _get_invite(self) -> str:
-        r = await self.client.get("/retrieve_agent_invitation")
-        return r.json().get("invitation_url")
+        r = await self._long_poll("/retrieve_agent_invitation")
+        return json_loads(r.content).get("invitation_url")
 
     async def get_invite(self) -> dict:
         url = await self._get_invite()
-        return json.loads(urlsafe_b64decode(url.split("oob=")[1]))
+        params = parse_qs(urlparse(url).query)
+        payload = params.get("oob") or params.get("c_i")
+        if not payload:
+            raise ValueError(f"Invalid invitation URL: {url}")
+        return json_loads(b64url_decode(payload[0]))
 
 
 class Acapy:
-    conn_states_order = {"invitation": 0, "request": 1, "response": 2, "active": 3}
-
     def __init__(self, controller: Controller):
         self.controller = controller
 
     async def get_invite(self) -> str:
         invitation = await self.controller.post(
             "/out-of-band/create-invitation",
-            json={
-                "accept": ["didcomm/aip1", "didcomm/aip2;env=rfc19"],
-                "handshake_protocols": [
-                    "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/didexchange/1.0",
-                    "https://didcomm.org/didexchange/1.0",
-                ],
-                "protocol_version": "1.1",
-            },
+            json=CREATE_INVITATION_BODY,
             response=InvitationRecord,
         )
         return invitation.invitation_url
 
     async def receive_invitation(self, invite: dict) -> Mapping[str, Any]:
-        oob_record = await self.controller.post(
-            "/out-of-band/receive-invitation",
-            json=invite,
-            params={"auto_accept": "true"},
-        )
-
-        conn_record = await self.controller.record_with_values(
-            "connections",
-            invitation_msg_id=oob_record["invi_msg_id"],
-            rfc23_state="completed",
+        # The invitation id is known up front so the wait can overlap the request
+        completed = asyncio.ensure_future(
+            self.controller.record_with_values(
+                "connections",
+                invitation_msg_id=invite["@id"],
+                rfc23_state="completed",
+            )
         )
-        return conn_record
+        try:
+            await self.controller.post(
+                "/out-of-band/receive-invitation",
+                json=invite,
+                params={"auto_accept": "true"},
+            )
+            return await completed
+        finally:
+            # Don't leave the wait running if the request failed
+            if not completed.done():
+                completed.cancel()
+                with suppress(asyncio.CancelledError):
+                    await completed
 
     async def request_mediation(self, conn_id: str):
-        await self.controller.post(
+        mediation_record = await self.controller.post(
             f"/mediation/request/{conn_id}",
         )
-        mediation_record = await self.controller.record_with_values(
-            "mediation",
-            state="granted",
-        )
+        if mediation_record.get("state") != "granted":
+            mediation_record = await self.controller.record_with_values(
+                "mediation",
+                mediation_id=mediation_record["mediation_id"],
+                state="granted",
+            )
         return mediation_record.get("mediation_id")
 
     async def set_default_mediator(self, mediation_id: str):
@@ -188,49 +289,63 @@ class Acapy:
         return result
 
 
+async def get_mediator_invite() -> str:
+    if MEDIATOR and not MEDIATOR_INVITE:
+        async with Controller(MEDIATOR) as mediator:
+            return await Acapy(mediator).get_invite()
+    elif MEDIATOR_INVITE:
+        return MEDIATOR_INVITE
+    else:
+        raise RuntimeError(
+            "MEDIATOR or MEDIATOR_INVITE environment variable must be set"
+        )
+
+
 async def main():
-    async with AsyncClient(base_url=PROXY, timeout=60.0) as client, Controller(
-        AGENT, headers=json.loads(AGENT_HEADERS)
-    ) as controller:
+    async with AsyncClient(base_url=PROXY, timeout=60.0, limits=PROXY_LIMITS) as client:
         proxy = Proxy(client)
-        await proxy.initialized()
-        state = await proxy.get_status()
+        if await proxy.get_status() == "ready":
+            print("Proxy is ready.")
+            return
+
+        # Proxy initialization and mediator invitation retrieval are independent
+        state, mediator_invite = await asyncio.gather(
+            proxy.initialized(), get_mediator_invite()
+        )
         if state == "ready":
             print("Proxy is ready.")
             return
         else:
             print(f"Proxy state: {state}")
 
-        if MEDIATOR and not MEDIATOR_INVITE:
-            async with Controller(MEDIATOR) as mediator:
-                mediator_invite = await Acapy(mediator).get_invite()
-        elif MEDIATOR_INVITE:
-            mediator_invite = MEDIATOR_INVITE
-        else:
-            raise RuntimeError(
-                "MEDIATOR or MEDIATOR_INVITE environment variable must be set"
-            )
-
         await proxy.receive_mediator_invite(mediator_invite)
         print("Proxy and mediator are now connected.")
 
-        invite = await proxy.get_invite()
-        agent = Acapy(controller)
-        conn_record = await agent.receive_invitation(invite)
+        # Only connect to the agent once we know there is setup left to do
+        async with Controller(AGENT, headers=AGENT_HEADERS) as controller:
+            # Warm up the agent admin connection while the proxy produces its invite
+            invite, _ = await asyncio.gather(
+                proxy.get_invite(), controller.get("/status")
+            )
+            agent = Acapy(controller)
+            conn_record = await agent.receive_invitation(invite)
+
+            conn_id = conn_record["connection_id"]
+            if not isinstance(conn_id, str):
+                raise RuntimeError("Connection record is missing connection_id")
 
-        print("Proxy and agent are now connected.")
-        print(f"Proxy connection id: {conn_record['connection_id']}")
+            print("Proxy and agent are now connected.")
+            print(f"Proxy connection id: {conn_id}")
 
-        assert isinstance(conn_record["connection_id"], str)
-        mediation_id = await agent.request_mediation(conn_record["connection_id"])
-        print("Proxy has granted mediation to agent.")
-        print(f"Proxy mediation id: {mediation_id}")
+            mediation_id = await agent.request_mediation(conn_id)
+            print("Proxy has granted mediation to agent.")
+            print(f"Proxy mediation id: {mediation_id}")
 
-        if not mediation_id:
-            raise RuntimeError("Failed to request mediation")
+            if not mediation_id:
+                raise RuntimeError("Failed to request mediation")
 
-        await agent.set_default_mediator(mediation_id)
-        print("Proxy mediator is now default mediator for agent.")
+            await agent.set_default_mediator(mediation_id)
+            print("Proxy mediator is now default mediator for agent.")
 
 
 if __name__ == "__main__":
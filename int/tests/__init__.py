@@ -1,11 +1,21 @@
 import asyncio
-
-from typing import Any, Awaitable, Callable, Optional, TypeVar
+import random
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
 
 
 Subject = TypeVar("Subject", bound=Any)
 
 
+def backoff(
+    initial: float = 0.1, factor: float = 1.25, cap: float = 3.0, jitter: float = 0.1
+) -> Iterator[float]:
+    """Yield truncated exponential backoff delays with random jitter added."""
+    delay = initial
+    while True:
+        yield delay + random.uniform(0, jitter)
+        delay = min(delay * factor, cap)
+
+
 async def poll_until_condition(
     condition: Callable[[Subject], bool],
     retrieve: Callable[[], Awaitable[Subject]],
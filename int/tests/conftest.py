@@ -10,8 +10,9 @@
 
 import asyncio
 from base64 import urlsafe_b64decode
-import json
+from contextlib import suppress
 from os import getenv
+from urllib.parse import parse_qs, urlparse
 
 from controller.controller import Controller
 from controller.models import (
@@ -21,78 +22,127 @@ from controller.models import (
     MediationRecord,
 )
 from controller.logging import logging_to_stdout
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits
 import pytest
 import pytest_asyncio
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from . import backoff
+
 
 PROXY = getenv("PROXY", "http://proxy:3000")
 BOB = getenv("BOB", "http://bob:4012")
 EXTERNAL_MEDIATOR = getenv("EXTERNAL_MEDIATOR", "http://external_mediator:4013")
+HANDSHAKE_TIMEOUT = float(getenv("HANDSHAKE_TIMEOUT_S", "30"))
+RETRIEVE_INVITE_TIMEOUT = float(getenv("RETRIEVE_INVITE_TIMEOUT_S", "30"))
+CREATE_INVITATION_BODY = {
+    "accept": ["didcomm/aip1", "didcomm/aip2;env=rfc19"],
+    "handshake_protocols": [
+        "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/didexchange/1.0",
+        "https://didcomm.org/didexchange/1.0",
+    ],
+    "protocol_version": "1.1",
+}
+
+
+def _b64url_decode(value: str) -> bytes:
+    return urlsafe_b64decode(value + "=" * (-len(value) % 4))
 
 
-async def get_proxy_invite() -> dict:
-    async with AsyncClient(timeout=60.0) as client:
-        url = None
-        while url is None:
-            r = await client.get(f"{PROXY}/retrieve_agent_invitation")
-            url = r.json()["invitation_url"]
-            if not url:
-                await asyncio.sleep(1)
-        return json.loads(urlsafe_b64decode(url.split("oob=")[1]))
+def _decode_invite(url: str) -> dict:
+    params = parse_qs(urlparse(url).query)
+    payload = params.get("oob") or params.get("c_i")
+    if not payload:
+        raise ValueError(f"Invalid invitation URL: {url}")
+    return json_loads(_b64url_decode(payload[0]))
+
+
+async def get_proxy_invite(proxy: AsyncClient) -> dict:
+    return await asyncio.wait_for(
+        _retrieve_proxy_invite(proxy), RETRIEVE_INVITE_TIMEOUT
+    )
+
+
+async def _retrieve_proxy_invite(proxy: AsyncClient) -> dict:
+    url = None
+    delays = backoff()
+    while not url:
+        r = await proxy.get("/retrieve_agent_invitation", params={"wait": 30})
+        r.raise_for_status()
+        url = r.json().get("invitation_url")
+        if not url:
+            await asyncio.sleep(next(delays))
+    return _decode_invite(url)
 
 
 async def get_mediator_invite(external_mediator: Controller) -> str:
     invitation = await external_mediator.post(
         "/out-of-band/create-invitation",
-        json={
-            "accept": ["didcomm/aip1", "didcomm/aip2;env=rfc19"],
-            "handshake_protocols": [
-                "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/didexchange/1.0",
-                "https://didcomm.org/didexchange/1.0",
-            ],
-            "protocol_version": "1.1",
-        },
+        json=CREATE_INVITATION_BODY,
         params={"auto_accept": "true"},
         response=InvitationRecord,
     )
     return invitation.invitation_url
 
 
-async def proxy_receive_mediator_invite(external_mediator: Controller, invite: str):
-    async with AsyncClient(timeout=60.0) as client:
-        r = await client.post(
-            f"{PROXY}/receive_mediator_invitation", json={"invitation_url": invite}
-        )
-        assert not r.is_error
-
-    await external_mediator.record_with_values("mediation", state="granted")
+async def proxy_initialized(proxy: AsyncClient) -> str:
+    r = await proxy.get("/status", params={"wait": 30, "current": "init"})
+    r.raise_for_status()
+    return r.json()["status"]
 
 
-async def agent_receive_invitation(bob: Controller, invite: dict) -> ConnRecord:
-    oob_record = await bob.post(
-        "/out-of-band/receive-invitation",
-        json=invite,
-        params={"auto_accept": "true"},
+async def proxy_receive_mediator_invite(proxy: AsyncClient, invite: str):
+    r = await proxy.post(
+        "/receive_mediator_invitation", json={"invitation_url": invite}
     )
+    r.raise_for_status()
 
-    conn_record = await bob.record_with_values(
-        "connections",
-        record_type=ConnRecord,
-        invitation_msg_id=oob_record["invi_msg_id"],
-        rfc23_state="completed",
-    )
-    return conn_record
+
+async def agent_receive_invitation(bob: Controller, invite: dict) -> ConnRecord:
+    async def _receive() -> ConnRecord:
+        # The invitation id is known up front so the wait can overlap the request
+        completed = asyncio.ensure_future(
+            bob.record_with_values(
+                "connections",
+                record_type=ConnRecord,
+                invitation_msg_id=invite["@id"],
+                rfc23_state="completed",
+            )
+        )
+        try:
+            await bob.post(
+                "/out-of-band/receive-invitation",
+                json=invite,
+                params={"auto_accept": "true"},
+            )
+            return await completed
+        finally:
+            # Don't leave the wait running if the request failed or timed out
+            if not completed.done():
+                completed.cancel()
+                with suppress(asyncio.CancelledError):
+                    await completed
+
+    return await asyncio.wait_for(_receive(), HANDSHAKE_TIMEOUT)
 
 
 async def agent_request_mediation_from_proxy(bob: Controller, conn_id: str):
-    await bob.post(
+    mediation_record = await bob.post(
         f"/mediation/request/{conn_id}",
     )
-    mediation_record = await bob.record_with_values(
-        "mediation",
-        state="granted",
-    )
+    if mediation_record.get("state") != "granted":
+        mediation_record = await asyncio.wait_for(
+            bob.record_with_values(
+                "mediation",
+                mediation_id=mediation_record["mediation_id"],
+                state="granted",
+            ),
+            HANDSHAKE_TIMEOUT,
+        )
     return mediation_record
 
 
@@ -105,24 +155,60 @@ async def agent_set_default_mediator(bob: Controller, mediation_id: str):
 
 @pytest.fixture(scope="session")
 def event_loop():
-    policy = asyncio.get_event_loop_policy()
+    try:
+        import uvloop
+
+        policy = uvloop.EventLoopPolicy()
+    except ImportError:
+        policy = asyncio.get_event_loop_policy()
     loop = policy.new_event_loop()
     yield loop
     loop.close()
 
 
+@pytest_asyncio.fixture(scope="session")
+async def proxy():
+    async with AsyncClient(
+        base_url=PROXY,
+        timeout=60.0,
+        limits=Limits(max_connections=100, max_keepalive_connections=20),
+    ) as client:
+        yield client
+
+
+@pytest_asyncio.fixture(scope="session")
+async def bob():
+    async with Controller(BOB) as controller:
+        yield controller
+
+
+@pytest_asyncio.fixture(scope="session")
+async def external_mediator():
+    async with Controller(EXTERNAL_MEDIATOR) as controller:
+        yield controller
+
+
 @pytest_asyncio.fixture(autouse=True, scope="session")
-async def setup():
+async def setup(proxy: AsyncClient, bob: Controller, external_mediator: Controller):
     logging_to_stdout()
-    async with Controller(BOB) as bob, Controller(
-        EXTERNAL_MEDIATOR
-    ) as external_mediator:
-        mediator_invite = await get_mediator_invite(external_mediator)
-        await proxy_receive_mediator_invite(external_mediator, mediator_invite)
-        invite = await get_proxy_invite()
-        conn_record = await agent_receive_invitation(bob, invite)
-        mediation_record = await agent_request_mediation_from_proxy(
-            bob, conn_record.connection_id
-        )
-        assert mediation_record["mediation_id"]
-        await agent_set_default_mediator(bob, mediation_record["mediation_id"])
+    # Bob is not needed until later; warm its admin connection alongside
+    mediator_invite, *_ = await asyncio.gather(
+        get_mediator_invite(external_mediator),
+        proxy_initialized(proxy),
+        bob.get("/status"),
+    )
+    await proxy_receive_mediator_invite(proxy, mediator_invite)
+    # Proxy creates its agent invitation while mediation is being granted
+    invite, _ = await asyncio.wait_for(
+        asyncio.gather(
+            get_proxy_invite(proxy),
+            external_mediator.record_with_values("mediation", state="granted"),
+        ),
+        HANDSHAKE_TIMEOUT,
+    )
+    conn_record = await agent_receive_invitation(bob, invite)
+    mediation_record = await agent_request_mediation_from_proxy(
+        bob, conn_record.connection_id
+    )
+    assert mediation_record["mediation_id"]
+    await agent_set_default_mediator(bob, mediation_record["mediation_id"])
@@ -1,3 +1,4 @@
+import asyncio
 from os import getenv
 
 import pytest
@@ -13,13 +14,6 @@ async def alice():
         yield controller
 
 
-@pytest_asyncio.fixture(scope="session")
-async def bob():
-    BOB = getenv("BOB", "http://bob:3001")
-    async with Controller(BOB) as controller:
-        yield controller
-
-
 agents = [
     ("alice", "bob", "http://alice:3000"),
     ("bob", "alice", "http://reverse-proxy"),
@@ -57,13 +51,15 @@ async def test_connection_from_alice(
 
     assert invite.invitation.service_endpoint == endpoint
 
-    await sender.record_with_values(
-        "connections",
-        connection_id=invite.connection_id,
-        state="active",
-    )
-    await receiver.record_with_values(
-        "connections", connection_id=connection.connection_id, state="active"
+    await asyncio.gather(
+        sender.record_with_values(
+            "connections",
+            connection_id=invite.connection_id,
+            state="active",
+        ),
+        receiver.record_with_values(
+            "connections", connection_id=connection.connection_id, state="active"
+        ),
     )
 
     endpoint_retrieved = await receiver.get(
@@ -3,6 +3,7 @@
 import asyncio
 from contextlib import asynccontextmanager, suppress
 import logging
+import re
 import signal
 
 from aiohttp import web
@@ -18,6 +19,7 @@ from .store import Store
 
 
 LOGGER = logging.getLogger("proxy_mediator")
+INVITE_TYPE = re.compile(r"[?&](c_i|oob)=")
 
 
 def config():
@@ -55,6 +57,25 @@ def config():
         required=False,
         default=20.0,
     )
+    parser.add_argument(
+        "--max-concurrent-messages",
+        env_var="MAX_CONCURRENT_MESSAGES",
+        type=int,
+        required=False,
+        default=1,
+        help=(
+            "Maximum number of messages from the mediator handled at once; "
+            "values above 1 may forward messages out of order"
+        ),
+    )
+    parser.add_argument(
+        "--max-message-size",
+        env_var="MAX_MESSAGE_SIZE",
+        type=int,
+        required=False,
+        default=2 * 1024 * 1024,
+        help="Maximum size in bytes of inbound messages",
+    )
     args = parser.parse_args()
 
     # Configure logs
@@ -73,16 +94,19 @@ def config():
 
 
 @asynccontextmanager
-async def webserver(port: int, agent: Agent):
-    """Listen for messages and handle using Connections."""
+async def webserver(port: int, agent: Agent, max_message_size: int):
+    """Listen for messages and handle using Connections.
+
+    Requests with bodies of max_message_size bytes or more are answered with 413,
+    so at most about max_message_size bytes are buffered per request.
+    """
 
     async def sleep():
         print(
             "======== Running on {} ========\n(Press CTRL+C to quit)".format(port),
             flush=True,
         )
-        while True:
-            await asyncio.sleep(3600)
+        await asyncio.Event().wait()
 
     async def handle(request):
         """Aiohttp handle POST."""
@@ -96,9 +120,9 @@ async def webserver(port: int, agent: Agent):
         except Exception:
             LOGGER.exception("Failed to handle message")
 
-        raise web.HTTPAccepted()
+        return web.Response(status=202)
 
-    app = web.Application()
+    app = web.Application(client_max_size=max_message_size)
     app.add_routes([web.post("/", handle)])
 
     # Setup "Admin" routes
@@ -122,9 +146,11 @@ def handle_oob_and_connections_invites(
     """Handle OOB and Connections invites."""
 
     async def _handle_oob_and_connections_invites(invite: str, **kargs):
-        if "c_i=" in invite:
+        match = INVITE_TYPE.search(invite)
+        kind = match.group(1) if match else None
+        if kind == "c_i":
             return await connections.receive_invite_url(invite, **kargs)
-        elif "oob=" in invite:
+        elif kind == "oob":
             return await did_exchange.receive_invite_url(invite, **kargs)
         else:
             raise ValueError("Invalid invite")
@@ -174,7 +200,7 @@ async def main():
         LOGGER.debug("Recalling connections")
         await agent.load_connections_from_store(store)
 
-    async with webserver(args.port, agent):
+    async with webserver(args.port, agent, args.max_message_size):
         if agent.mediator_connection:
             LOGGER.debug("Mediator connection loaded from store")
         else:
@@ -230,7 +256,11 @@ async def main():
             LOGGER.debug("Saving connections")
             await agent.save_connections_to_store(store)
 
-        retriever = MessageRetriever(agent.mediator_connection, args.poll_interval)
+        retriever = MessageRetriever(
+            agent.mediator_connection,
+            args.poll_interval,
+            args.max_concurrent_messages,
+        )
 
         try:
             agent.state = "ready"
@@ -241,6 +271,13 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
     loop = asyncio.get_event_loop()
     main_task = asyncio.ensure_future(main())
 
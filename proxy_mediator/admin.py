@@ -1,35 +1,97 @@
 """Admin routes."""
 
+import asyncio
+from contextlib import suppress
 import logging
+import math
+from typing import Any
 
 from aiohttp import web
 
 from .agent import Agent
+from .encode import json_dumps, json_loads
 
 LOGGER = logging.getLogger(__name__)
+MAX_WAIT = 60.0
+STREAM_KEEPALIVE = 15.0
+
+
+def _wait_param(request: web.Request) -> float:
+    """Return the number of seconds a long-poll request may be held open.
+
+    Requested waits are capped at MAX_WAIT seconds.
+    """
+    try:
+        wait = float(request.query.get("wait", 0))
+    except ValueError:
+        wait = math.nan
+    if math.isnan(wait):
+        raise web.HTTPBadRequest(reason="wait must be a number of seconds")
+    return min(wait, MAX_WAIT)
+
+
+def _json_response(data: Any) -> web.Response:
+    """Return data as a JSON response."""
+    return web.json_response(data, dumps=json_dumps)
 
 
 def register_routes(app: web.Application):
-    """Register admin routes."""
+    """Register admin routes.
+
+    The GET routes accept an optional `wait` query parameter. When given, the
+    request is held open for up to that many seconds (at most MAX_WAIT) until
+    there is something new to report instead of answering immediately.
+    """
 
     agent = Agent.get()
 
-    async def retrieve_agent_invitation(request):
-        return web.json_response({"invitation_url": agent.agent_invitation})
+    async def retrieve_agent_invitation(request: web.Request):
+        wait = _wait_param(request)
+        if wait > 0 and not agent.agent_invitation:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(agent.agent_invitation_created(), wait)
+        return _json_response({"invitation_url": agent.agent_invitation})
 
     async def receive_mediator_invitation(request: web.Request):
-        body = await request.json()
+        body = await request.json(loads=json_loads)
         await agent.receive_mediator_invite(body["invitation_url"])
         return web.Response(status=200)
 
     async def status(request: web.Request):
-        return web.json_response({"status": agent.state})
+        # Hold while the agent remains in the state the client last observed
+        wait = _wait_param(request)
+        if wait > 0 and agent.state == request.query.get("current", "init"):
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(agent.state_changed(), wait)
+        return _json_response({"status": agent.state})
+
+    async def status_stream(request: web.Request):
+        """Push each state transition as a line of JSON until the agent is ready.
+
+        An empty line is sent every STREAM_KEEPALIVE seconds without a
+        transition so idle clients do not hit their read timeout.
+        """
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        state = None
+        while state != "ready":
+            if agent.state == state:
+                try:
+                    await asyncio.wait_for(agent.state_changed(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await response.write(b"\n")
+                    continue
+            state = agent.state
+            await response.write(json_dumps({"status": state}).encode() + b"\n")
+        await response.write_eof()
+        return response
 
     app.add_routes(
         [
             web.get("/retrieve_agent_invitation", retrieve_agent_invitation),
             web.post("/receive_mediator_invitation", receive_mediator_invitation),
             web.get("/status", status),
+            web.get("/status/stream", status_stream),
         ]
     )
     return app
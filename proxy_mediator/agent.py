@@ -3,13 +3,13 @@
 import asyncio
 from contextvars import ContextVar
 import logging
-from typing import Callable, Iterable, MutableMapping, Optional
+from typing import Callable, Iterable, List, MutableMapping, Optional
 
-from aries_staticagent.crypto import recipients_from_packed_message
 from aries_staticagent.dispatcher.base import Dispatcher
 from aries_staticagent.dispatcher.handler_dispatcher import NoRegisteredHandlerException
 
 from .connection import Connection
+from .encode import b64_to_bytes, json_loads
 from .store import Store
 
 
@@ -21,6 +21,16 @@ class ConnectionNotFound(Exception):
     """Raised when connection for message not found."""
 
 
+def recipients_from_packed_message(packed_message: bytes) -> List[str]:
+    """Return the recipient verkeys listed in the protected header of a message."""
+    try:
+        wrapper = json_loads(packed_message)
+        protected = json_loads(b64_to_bytes(wrapper["protected"], urlsafe=True))
+        return [recip["header"]["kid"] for recip in protected["recipients"]]
+    except (ValueError, KeyError, TypeError) as err:
+        raise ValueError("Invalid packed message") from err
+
+
 class Agent:
     """Agent."""
 
@@ -48,21 +58,59 @@ class Agent:
         # We want each connection created by this module to share the same routes
         # so this same dispatcher will be used for all created connections.
         self.dispatcher = dispatcher
-        self.state: str = "init"
+        self._state: str = "init"
+        self._state_event = asyncio.Event()
 
         # Special connections
         self.receive_invite_url = receive_invite_url
         self.mediator_connection: Optional[Connection] = None
         self._mediator_connection_event = asyncio.Event()
         self.agent_connection: Optional[Connection] = None
-        self.agent_invitation: Optional[str] = None
+        self._agent_invitation: Optional[str] = None
+        self._agent_invitation_event = asyncio.Event()
+
+    @property
+    def state(self) -> str:
+        """Return the current state of the agent."""
+        return self._state
+
+    @state.setter
+    def state(self, value: str):
+        """Set the state of the agent, notifying anyone awaiting a change."""
+        if value == self._state:
+            return
+        self._state = value
+        self._state_event.set()
+        self._state_event = asyncio.Event()
+
+    async def state_changed(self) -> str:
+        """Await the next state transition and return the new state."""
+        await self._state_event.wait()
+        return self._state
+
+    @property
+    def agent_invitation(self) -> Optional[str]:
+        """Return the invitation created for the agent, if any."""
+        return self._agent_invitation
+
+    @agent_invitation.setter
+    def agent_invitation(self, value: Optional[str]):
+        """Set the agent invitation, notifying anyone awaiting it."""
+        self._agent_invitation = value
+        if value:
+            self._agent_invitation_event.set()
+
+    async def agent_invitation_created(self) -> str:
+        """Await creation of the agent invitation."""
+        await self._agent_invitation_event.wait()
+        if not self._agent_invitation:
+            raise RuntimeError("Agent invitation event triggered without set")
+        return self._agent_invitation
 
     def connections_for_message(self, packed_message: bytes) -> Iterable[Connection]:
         """Get connections that are the intended recipients of a message."""
         recipients = recipients_from_packed_message(packed_message)
-        connections = [
-            self.connections[recip] for recip in recipients if recip in self.connections
-        ]
+        connections = [conn for conn in map(self.connections.get, recipients) if conn]
         if not connections:
             raise ConnectionNotFound(
                 f"No connections for message with recipients: {recipients}"
@@ -71,12 +119,17 @@ class Agent:
 
     async def handle_message(self, packed_message: bytes) -> Optional[bytes]:
         """Handle a received message."""
-        response = []
+        response: Optional[bytes] = None
+
+        def _set_response(body: bytes):
+            nonlocal response
+            response = body
+
         for conn in self.connections_for_message(packed_message):
             LOGGER.debug(
                 "Handling message with connection using verkey: %s", conn.verkey_b58
             )
-            with conn.session(response.append) as session:
+            with conn.session(_set_response) as session:
                 LOGGER.debug(
                     "Handling message with connection using verkey: %s", conn.verkey_b58
                 )
@@ -88,14 +141,13 @@ class Agent:
                 except NoRegisteredHandlerException:
                     LOGGER.exception("Failed to dispatch message to handler")
 
-        if response:
-            return response.pop()
-
-        return None
+        return response
 
     # Mediator setup operations
     async def mediator_invite_received(self) -> Connection:
         """Await event notifying that mediator invite has been received."""
+        if self.mediator_connection:
+            return self.mediator_connection
         await self._mediator_connection_event.wait()
         if not self.mediator_connection:
             raise RuntimeError("Mediator connection event triggered without set")
@@ -114,7 +166,9 @@ class Agent:
             async with store.session() as session:
                 entries = await store.retrieve_connections(session)
                 connections = [
-                    Connection.from_store(entry.value_json, dispatcher=self.dispatcher)
+                    Connection.from_store(
+                        json_loads(entry.value), dispatcher=self.dispatcher
+                    )
                     for entry in entries
                 ]
                 self.connections.update(
@@ -2,12 +2,12 @@
 
 import asyncio
 from asyncio.futures import Future
-import json
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 
 from aries_staticagent import Connection as AsaPyConn
 from aries_staticagent import crypto
-from statemachine import State, StateMachine
+
+from .encode import json_dumps
 
 
 class Connection(AsaPyConn):
@@ -66,7 +66,7 @@ class Connection(AsaPyConn):
                 ],
                 "endpoint": self.target.endpoint,
             }
-        return json.dumps(value)
+        return json_dumps(value)
 
     @classmethod
     def from_store(cls, value: dict, **kwargs) -> "Connection":
@@ -75,7 +75,7 @@ class Connection(AsaPyConn):
             (value["verkey"], value["sigkey"]),
             recipients=value.get("target", {}).get("recipients"),
             endpoint=value.get("target", {}).get("endpoint"),
-            **kwargs
+            **kwargs,
         )
         conn.state = value["state"]
         conn.multiuse = value["multiuse"]
@@ -84,28 +84,78 @@ class Connection(AsaPyConn):
         return conn
 
 
-class ConnectionMachine(StateMachine):
-    """State machine modeling the connection protocol."""
-
-    null = State("null", initial=True)
-    invite_sent = State("invite_sent")
-    invite_received = State("invited")
-    request_sent = State("request_sent")
-    request_received = State("requested")
-    response_sent = State("response_sent")
-    response_received = State("responded")
-    complete = State("complete")
-
-    send_invite = null.to(invite_sent)
-    receive_request = invite_sent.to(request_received)
-    send_response = request_received.to(response_sent)
-
-    receive_invite = null.to(invite_received)
-    send_request = invite_received.to(request_sent)
-    receive_response = request_sent.to(response_received)
-    send_ping = response_received.to(complete) | complete.to.itself()
-    receive_ping = response_sent.to(complete) | complete.to.itself()
-    send_complete = response_received.to(complete) | complete.to.itself()
-    receive_complete = response_sent.to(complete) | complete.to.itself()
-    send_ping_response = complete.to.itself()
-    receive_ping_response = complete.to.itself()
+class TransitionNotAllowed(Exception):
+    """Raised when a connection cannot take a transition from its current state."""
+
+
+def _transition(event: str) -> Callable[["ConnectionMachine"], None]:
+    """Return a method applying the named event to the connection."""
+
+    def _apply(self: "ConnectionMachine"):
+        self.apply(event)
+
+    _apply.__name__ = event
+    return _apply
+
+
+class ConnectionMachine:
+    """State machine modeling the connection protocol.
+
+    Connection state is kept on the connection itself as the state name; events
+    move it along a fixed (state, event) -> state table.
+    """
+
+    null = "null"
+    invite_sent = "invite_sent"
+    invite_received = "invite_received"
+    request_sent = "request_sent"
+    request_received = "request_received"
+    response_sent = "response_sent"
+    response_received = "response_received"
+    complete = "complete"
+
+    transitions: Dict[Tuple[str, str], str] = {
+        (null, "send_invite"): invite_sent,
+        (invite_sent, "receive_request"): request_received,
+        (request_received, "send_response"): response_sent,
+        (null, "receive_invite"): invite_received,
+        (invite_received, "send_request"): request_sent,
+        (request_sent, "receive_response"): response_received,
+        (response_received, "send_ping"): complete,
+        (complete, "send_ping"): complete,
+        (response_sent, "receive_ping"): complete,
+        (complete, "receive_ping"): complete,
+        (response_received, "send_complete"): complete,
+        (complete, "send_complete"): complete,
+        (response_sent, "receive_complete"): complete,
+        (complete, "receive_complete"): complete,
+        (complete, "send_ping_response"): complete,
+        (complete, "receive_ping_response"): complete,
+    }
+
+    def __init__(self, connection: Connection):
+        """Initialize the machine for a connection."""
+        self.connection = connection
+
+    def apply(self, event: str):
+        """Move the connection to the state the event leads to."""
+        try:
+            self.connection.state = self.transitions[(self.connection.state, event)]
+        except KeyError:
+            raise TransitionNotAllowed(
+                f"Can't {event} when in state {self.connection.state}"
+            ) from None
+
+    send_invite = _transition("send_invite")
+    receive_request = _transition("receive_request")
+    send_response = _transition("send_response")
+
+    receive_invite = _transition("receive_invite")
+    send_request = _transition("send_request")
+    receive_response = _transition("receive_response")
+    send_ping = _transition("send_ping")
+    receive_ping = _transition("receive_ping")
+    send_complete = _transition("send_complete")
+    receive_complete = _transition("receive_complete")
+    send_ping_response = _transition("send_ping_response")
+    receive_ping_response = _transition("receive_ping_response")
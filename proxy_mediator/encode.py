@@ -1,9 +1,26 @@
 """Encoding helpers."""
 
 import base64
-import json
 from typing import Any, Dict
 
+try:
+    import orjson
+
+    def json_dumps(value: Any) -> str:
+        """Serialize value to a compact JSON string."""
+        return orjson.dumps(value).decode()
+
+    json_loads = orjson.loads
+
+except ImportError:
+    import json
+
+    def json_dumps(value: Any) -> str:
+        """Serialize value to a compact JSON string."""
+        return json.dumps(value, separators=(",", ":"))
+
+    json_loads = json.loads
+
 
 def pad(val: str) -> str:
     """Pad base64 values if need be: JWT calls to omit trailing padding."""
@@ -45,11 +62,9 @@ def str_to_b64(val: str, urlsafe=False, encoding=None, pad=True) -> str:
 
 def dict_to_b64(val: Dict[str, Any], urlsafe=False, encoding=None, pad=True) -> str:
     """Convert a dict to base64 string on input encoding (default utf-8)."""
-    return bytes_to_b64(
-        json.dumps(val, separators=(",", ":")).encode(encoding or "utf-8"), urlsafe, pad
-    )
+    return bytes_to_b64(json_dumps(val).encode(encoding or "utf-8"), urlsafe, pad)
 
 
 def b64_to_dict(val: str, urlsafe=False) -> Dict[str, Any]:
     """Convert a base 64 string to dict."""
-    return json.loads(b64_to_bytes(val, urlsafe))
+    return json_loads(b64_to_bytes(val, urlsafe))
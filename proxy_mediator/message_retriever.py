@@ -3,7 +3,7 @@
 import asyncio
 from contextlib import suppress
 import logging
-from typing import Optional
+from typing import Optional, Set
 
 import aiohttp
 
@@ -37,10 +37,15 @@ class MessageRetriever:
     """Retrieve messages via websocket from a given connection.
 
     This class opens a websocket connection, and periodically polls for messages
-    using a trust ping with response requested set to false.
+    using a trust ping with response requested set to false. Up to max_concurrent
+    messages received over the websocket are handled at once. With the default of
+    one, messages are handled in order as they arrive; with more, they may be
+    forwarded in a different order than they were received.
     """
 
-    def __init__(self, conn: Connection, poll_interval: float = 5.0):
+    def __init__(
+        self, conn: Connection, poll_interval: float = 5.0, max_concurrent: int = 1
+    ):
         """Initialize the message retriever."""
         if not conn.diddoc:
             raise ValueError("Connection must have DID Doc for WS polling")
@@ -52,7 +57,11 @@ class MessageRetriever:
         self.endpoint = endpoint
         self.connection = conn
         self.socket: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._connected = asyncio.Event()
         self.poll_interval = poll_interval
+        self.max_concurrent = max_concurrent
+        self._handler_slots = asyncio.Semaphore(max_concurrent)
+        self._handler_tasks: Set[asyncio.Task] = set()
         self.poll_task: Optional[asyncio.Task] = None
         self.ws_task: Optional[asyncio.Task] = None
 
@@ -78,6 +87,13 @@ class MessageRetriever:
                 socket.exception(),
             )
 
+    async def _handle_ws_in_slot(
+        self, socket: aiohttp.ClientWebSocketResponse, msg: aiohttp.WSMessage
+    ):
+        """Handle a message from the websocket once a handler slot is free."""
+        async with self._handler_slots:
+            await self.handle_ws(socket, msg)
+
     async def ws(self):
         """Open websocket and handle messages."""
         LOGGER.debug("Starting websocket to %s", self.endpoint)
@@ -85,8 +101,16 @@ class MessageRetriever:
             try:
                 async with session.ws_connect(self.endpoint) as socket:
                     self.socket = socket
+                    self._connected.set()
                     async for msg in socket:
-                        await self.handle_ws(socket, msg)
+                        if self.max_concurrent == 1:
+                            await self.handle_ws(socket, msg)
+                            continue
+                        task = asyncio.ensure_future(
+                            self._handle_ws_in_slot(socket, msg)
+                        )
+                        self._handler_tasks.add(task)
+                        task.add_done_callback(self._handler_tasks.discard)
             except Exception:
                 LOGGER.exception("Websocket connection error")
         self.socket = None
@@ -111,13 +135,19 @@ class MessageRetriever:
     async def start(self):
         """Start the message retriever."""
         self.ws_task = asyncio.ensure_future(self.ws())
-        await asyncio.sleep(1)
+        # Begin polling as soon as the socket is open rather than after a fixed delay
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._connected.wait(), 1)
         await self.poll()
 
     async def stop(self):
         """Stop the message retriever."""
         if self.socket:
             await self.socket.close()
+        handler_tasks = list(self._handler_tasks)
+        for task in handler_tasks:
+            task.cancel()
+        await asyncio.gather(*handler_tasks, return_exceptions=True)
         if self.poll_task:
             self.poll_task.cancel()
             with suppress(asyncio.CancelledError):
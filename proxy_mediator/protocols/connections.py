@@ -3,7 +3,6 @@
 https://github.com/hyperledger/aries-rfcs/blob/main/features/0160-connection-protocol.
 """
 
-from base64 import urlsafe_b64decode
 from contextvars import ContextVar
 import json
 import logging
@@ -15,6 +14,7 @@ from aries_staticagent.dispatcher.base import Dispatcher
 from aries_staticagent.module import Module, ModuleRouter
 
 from ..connection import Connection, ConnectionMachine
+from ..encode import b64_to_dict
 from ..error import ProtocolError
 from .constants import DIDCOMM, DIDCOMM_OLD
 
@@ -94,7 +94,7 @@ class Connections(Module):
     async def receive_invite_url(self, invite: str, **kwargs):
         """Process an invitation from a URL."""
         invite_msg = Message.parse_obj(
-            json.loads(urlsafe_b64decode(invite.split("c_i=")[1]))
+            b64_to_dict(invite.partition("c_i=")[2], urlsafe=True)
         )
         return await self.receive_invite(invite_msg, **kwargs)
 
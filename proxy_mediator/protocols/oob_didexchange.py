@@ -137,7 +137,7 @@ class OobDidExchange(Connections):
         sig_data = unpad(data)
         protected = signed_attachment["data"]["jws"]["protected"]
         pub_key_bytes = b64_to_bytes(
-            json.loads(b64_to_bytes(protected, urlsafe=True))["jwk"]["x"], urlsafe=True
+            b64_to_dict(protected, urlsafe=True)["jwk"]["x"], urlsafe=True
         )
         sig = signed_attachment["data"]["jws"]["signature"]
 
@@ -151,7 +151,9 @@ class OobDidExchange(Connections):
 
     async def receive_invite_url(self, invite: str, **kwargs):
         """Process an invitation from a URL."""
-        invite_msg = Message.parse_obj(b64_to_dict(invite.split("oob=", 1)[1]))
+        invite_msg = Message.parse_obj(
+            b64_to_dict(invite.partition("oob=")[2], urlsafe=True)
+        )
         return await self.receive_invite(invite_msg, **kwargs)
 
     async def receive_invite(self, invite: Message, *, endpoint: Optional[str] = None):
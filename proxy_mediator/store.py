@@ -98,8 +98,7 @@ class Store:
             )
         except AskarError as err:
             if err.code == AskarErrorCode.DUPLICATE:
-                await session.remove(self.CATEGORY_CONNECTIONS, connection.verkey_b58)
-                await session.insert(
+                await session.replace(
                     self.CATEGORY_CONNECTIONS, connection.verkey_b58, value
                 )
             else:
@@ -116,8 +115,7 @@ class Store:
             )
         except AskarError as err:
             if err.code == AskarErrorCode.DUPLICATE:
-                await session.remove(self.CATEGORY_IDENTIFIERS, self.IDENTIFIER_AGENT)
-                await session.insert(
+                await session.replace(
                     self.CATEGORY_IDENTIFIERS,
                     self.IDENTIFIER_AGENT,
                     key,
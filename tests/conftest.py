@@ -0,0 +1,16 @@
+"""Shared test fixtures."""
+
+from aries_staticagent.dispatcher.handler_dispatcher import HandlerDispatcher
+import pytest
+
+from proxy_mediator.agent import Agent
+
+
+async def _receive_invite_url(*args):
+    """Stand in for the mediator invitation callback."""
+
+
+@pytest.fixture
+async def agent():
+    """Create an agent on the test event loop."""
+    yield Agent(HandlerDispatcher(), _receive_invite_url)
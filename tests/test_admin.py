@@ -0,0 +1,115 @@
+"""Test admin long-poll routes."""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+import pytest
+
+from proxy_mediator import admin
+from proxy_mediator.agent import Agent
+
+
+def admin_client(agent: Agent) -> TestClient:
+    """Return a test client for the admin routes of agent."""
+    Agent.set(agent)
+    app = web.Application()
+    admin.register_routes(app)
+    return TestClient(TestServer(app))
+
+
+def set_later(delay: float, obj, attr: str, value):
+    """Set an attribute on obj after delay seconds."""
+    asyncio.get_event_loop().call_later(delay, setattr, obj, attr, value)
+
+
+@pytest.mark.asyncio
+async def test_status_wait_wakes_on_transition(agent):
+    async with admin_client(agent) as client:
+        set_later(0.05, agent, "state", "setup")
+        resp = await asyncio.wait_for(
+            client.get("/status", params={"wait": "5", "current": "init"}), 1
+        )
+        assert resp.status == 200
+        assert await resp.json() == {"status": "setup"}
+
+
+@pytest.mark.asyncio
+async def test_status_wait_times_out_without_transition(agent):
+    async with admin_client(agent) as client:
+        resp = await client.get("/status", params={"wait": "0.05", "current": "init"})
+        assert resp.status == 200
+        assert await resp.json() == {"status": "init"}
+
+
+@pytest.mark.asyncio
+async def test_status_returns_immediately_when_state_differs(agent):
+    agent.state = "setup"
+    async with admin_client(agent) as client:
+        resp = await asyncio.wait_for(
+            client.get("/status", params={"wait": "5", "current": "init"}), 1
+        )
+        assert await resp.json() == {"status": "setup"}
+
+
+@pytest.mark.asyncio
+async def test_invitation_wait_wakes_when_created(agent):
+    async with admin_client(agent) as client:
+        set_later(0.05, agent, "agent_invitation", "http://example.com?oob=abc")
+        resp = await asyncio.wait_for(
+            client.get("/retrieve_agent_invitation", params={"wait": "5"}), 1
+        )
+        assert resp.status == 200
+        assert await resp.json() == {"invitation_url": "http://example.com?oob=abc"}
+
+
+@pytest.mark.asyncio
+async def test_invitation_wait_times_out_without_invitation(agent):
+    async with admin_client(agent) as client:
+        resp = await client.get("/retrieve_agent_invitation", params={"wait": "0.05"})
+        assert resp.status == 200
+        assert await resp.json() == {"invitation_url": None}
+
+
+@pytest.mark.asyncio
+async def test_invalid_wait_rejected(agent):
+    async with admin_client(agent) as client:
+        for wait in ("soon", "nan"):
+            resp = await client.get("/status", params={"wait": wait})
+            assert resp.status == 400
+
+
+def test_wait_clamped_to_max():
+    request = make_mocked_request("GET", "/status?wait=3600")
+    assert admin._wait_param(request) == admin.MAX_WAIT
+
+
+async def read_stream(client: TestClient):
+    """Return the lines of the status stream until the server closes it."""
+    resp = await client.get("/status/stream")
+    assert resp.status == 200
+    assert resp.headers["Content-Type"] == "application/x-ndjson"
+    return [line.decode() async for line in resp.content]
+
+
+@pytest.mark.asyncio
+async def test_status_stream_follows_transitions_to_ready(agent):
+    async with admin_client(agent) as client:
+        set_later(0.05, agent, "state", "setup")
+        set_later(0.1, agent, "state", "ready")
+        lines = await asyncio.wait_for(read_stream(client), 1)
+    assert [line for line in lines if line.strip()] == [
+        '{"status":"init"}\n',
+        '{"status":"setup"}\n',
+        '{"status":"ready"}\n',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_status_stream_sends_keepalive_while_idle(agent, monkeypatch):
+    monkeypatch.setattr(admin, "STREAM_KEEPALIVE", 0.02)
+    async with admin_client(agent) as client:
+        set_later(0.1, agent, "state", "ready")
+        lines = await asyncio.wait_for(read_stream(client), 1)
+    assert "\n" in lines
+    assert lines[-1] == '{"status":"ready"}\n'
@@ -0,0 +1,55 @@
+"""Test agent message routing helpers."""
+
+from aries_staticagent.connection import Target
+import pytest
+
+from proxy_mediator.agent import Connection, recipients_from_packed_message
+from proxy_mediator.encode import dict_to_b64, json_dumps
+
+
+def envelope(protected) -> bytes:
+    """Return a packed message envelope with the given protected header."""
+    return json_dumps(
+        {
+            "protected": dict_to_b64(protected, urlsafe=True, pad=False),
+            "iv": "iv",
+            "ciphertext": "ciphertext",
+            "tag": "tag",
+        }
+    ).encode()
+
+
+def test_recipients_from_packed_message():
+    packed = envelope(
+        {
+            "enc": "xchacha20poly1305_ietf",
+            "typ": "JWM/1.0",
+            "alg": "Anoncrypt",
+            "recipients": [
+                {"encrypted_key": "key1", "header": {"kid": "verkey1"}},
+                {"encrypted_key": "key2", "header": {"kid": "verkey2"}},
+            ],
+        }
+    )
+    assert recipients_from_packed_message(packed) == ["verkey1", "verkey2"]
+
+
+def test_recipients_from_packed_message_packed_by_connection():
+    recipient = Connection.random()
+    sender = Connection.random(target=Target(their_vk=recipient.verkey_b58))
+    packed = sender.pack({"@type": "https://didcomm.org/trust_ping/1.0/ping"})
+    assert recipients_from_packed_message(packed) == [recipient.verkey_b58]
+
+
+@pytest.mark.parametrize(
+    "packed",
+    [
+        b"not json",
+        json_dumps({"iv": "iv", "ciphertext": "ciphertext"}).encode(),
+        envelope({"recipients": [{"encrypted_key": "key", "header": {}}]}),
+    ],
+    ids=["bad_json", "missing_protected", "missing_kid"],
+)
+def test_recipients_from_packed_message_invalid(packed):
+    with pytest.raises(ValueError):
+        recipients_from_packed_message(packed)
@@ -0,0 +1,40 @@
+"""Test connection state machine."""
+
+import pytest
+
+from proxy_mediator.connection import (
+    Connection,
+    ConnectionMachine,
+    TransitionNotAllowed,
+)
+
+
+@pytest.mark.asyncio
+async def test_connection_machine_inviter():
+    conn = Connection.random()
+    ConnectionMachine(conn).send_invite()
+    ConnectionMachine(conn).receive_request()
+    ConnectionMachine(conn).send_response()
+    ConnectionMachine(conn).receive_ping()
+    ConnectionMachine(conn).receive_ping()
+    assert conn.state == "complete"
+
+
+@pytest.mark.asyncio
+async def test_connection_machine_invitee():
+    conn = Connection.random()
+    ConnectionMachine(conn).receive_invite()
+    assert conn.state == "invite_received"
+    ConnectionMachine(conn).send_request()
+    ConnectionMachine(conn).receive_response()
+    assert conn.state == "response_received"
+    ConnectionMachine(conn).send_complete()
+    assert conn.state == "complete"
+
+
+@pytest.mark.asyncio
+async def test_connection_machine_rejects_invalid_transition():
+    conn = Connection.random()
+    with pytest.raises(TransitionNotAllowed):
+        ConnectionMachine(conn).send_response()
+    assert conn.state == "null"
@@ -0,0 +1,81 @@
+"""Test handling of messages retrieved over websocket."""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import pytest
+
+from proxy_mediator.connection import Connection
+from proxy_mediator.message_retriever import MessageRetriever
+
+MESSAGE_COUNT = 6
+
+
+@pytest.fixture
+async def server():
+    """Websocket server sending MESSAGE_COUNT binary messages, then closing."""
+
+    async def handler(request: web.Request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        for index in range(MESSAGE_COUNT):
+            await socket.send_bytes(bytes([index]))
+        await socket.close()
+        return socket
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    async with TestServer(app) as server:
+        yield server
+
+
+def retriever_for(
+    server: TestServer, max_concurrent: int, delay: float = 0.01
+) -> MessageRetriever:
+    """Return a retriever for server that records how messages are handled."""
+    conn = Connection.random()
+    conn.diddoc = {
+        "service": [{"serviceEndpoint": f"ws://{server.host}:{server.port}/ws"}]
+    }
+    retriever = MessageRetriever(conn, max_concurrent=max_concurrent)
+    retriever.handled = []
+    retriever.active = 0
+    retriever.max_active = 0
+
+    async def handle_ws(socket, msg):
+        retriever.active += 1
+        retriever.max_active = max(retriever.max_active, retriever.active)
+        await asyncio.sleep(delay)
+        retriever.handled.append(msg.data)
+        retriever.active -= 1
+
+    retriever.handle_ws = handle_ws
+    return retriever
+
+
+@pytest.mark.asyncio
+async def test_messages_handled_in_order_by_default(server):
+    retriever = retriever_for(server, max_concurrent=1)
+    await asyncio.wait_for(retriever.ws(), 5)
+    assert retriever.handled == [bytes([index]) for index in range(MESSAGE_COUNT)]
+    assert retriever.max_active == 1
+    assert not retriever._handler_tasks
+
+
+@pytest.mark.asyncio
+async def test_concurrent_handling_bounded(server):
+    retriever = retriever_for(server, max_concurrent=2)
+    await asyncio.wait_for(retriever.ws(), 5)
+    await asyncio.gather(*retriever._handler_tasks)
+    assert len(retriever.handled) == MESSAGE_COUNT
+    assert retriever.max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_stop_releases_slots_of_cancelled_handlers(server):
+    retriever = retriever_for(server, max_concurrent=2, delay=10)
+    await asyncio.wait_for(retriever.ws(), 5)
+    assert len(retriever._handler_tasks) == MESSAGE_COUNT
+    await retriever.stop()
+    assert retriever._handler_slots._value == 2
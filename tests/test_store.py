@@ -119,3 +119,20 @@ async def test_store_retrieve_mediator(store: Store, connection: Connection):
             retrieved = await store.retrieve_mediator(session)
 
         assert retrieved == connection.verkey_b58
+
+
+@pytest.mark.asyncio
+async def test_store_connection_replaces_existing(store: Store, connection: Connection):
+    async with store:
+        async with store.session() as session:
+            await store.store_connection(session, connection)
+            connection.state = "complete"
+            await store.store_connection(session, connection)
+
+        async with store.session() as session:
+            entry = await session.fetch(
+                Store.CATEGORY_CONNECTIONS, connection.verkey_b58
+            )
+
+        assert entry
+        assert Connection.from_store(entry.value_json).state == "complete"
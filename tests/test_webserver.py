@@ -0,0 +1,31 @@
+"""Test the inbound message endpoint."""
+
+import aiohttp
+from aiohttp.test_utils import unused_port
+import pytest
+
+from proxy_mediator.__main__ import webserver
+from proxy_mediator.agent import Agent
+
+MAX_MESSAGE_SIZE = 1024
+
+
+async def post_message(agent: Agent, body: bytes) -> int:
+    """Post body to a webserver for agent and return the response status."""
+    Agent.set(agent)
+    port = unused_port()
+    async with webserver(port, agent, MAX_MESSAGE_SIZE):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"http://127.0.0.1:{port}/", data=body) as resp:
+                return resp.status
+
+
+@pytest.mark.asyncio
+async def test_webserver_rejects_oversized_message(agent):
+    assert await post_message(agent, b"x" * MAX_MESSAGE_SIZE) == 413
+
+
+@pytest.mark.asyncio
+async def test_webserver_accepts_message_under_limit(agent):
+    # Not a valid envelope, so it is accepted and then dropped
+    assert await post_message(agent, b"x" * (MAX_MESSAGE_SIZE - 1)) == 202